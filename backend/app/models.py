@@ -1,5 +1,5 @@
 from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, LargeBinary
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -36,11 +36,12 @@ class PromptHistory(Base):
     created_at = Column(DateTime, server_default=func.now())
     share_token = Column(String(64), unique=True, nullable=True)
 
-    # 文件存储（二进制存 PostgreSQL）
-    video_data = Column(LargeBinary, nullable=True)
+    # 文件存储（旧版二进制存 PostgreSQL，现已改存本地磁盘）
+    # deferred：查询历史记录时不加载大字段，旧数据的 BYTEA 不再被整行读入内存
+    video_data = deferred(Column(LargeBinary, nullable=True))
     video_filename = Column(String(255), nullable=True)
     video_content_type = Column(String(100), nullable=True)
-    image_data = Column(LargeBinary, nullable=True)
+    image_data = deferred(Column(LargeBinary, nullable=True))
     image_filename = Column(String(255), nullable=True)
     image_content_type = Column(String(100), nullable=True)
 
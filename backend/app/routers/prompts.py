@@ -6,12 +6,13 @@ import re
 import os
 import uuid
 import asyncio
+from functools import lru_cache
 from typing import Optional, Dict, List, Any
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
-from app.database import get_db
+from app.database import get_db, AsyncSessionLocal
 from app import models
 from app.auth import get_current_user
 from app.config import settings
@@ -23,31 +24,79 @@ UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "/tmp/uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
-def _save_uploaded_file(file_bytes: bytes, filename: str, content_type: str) -> Dict:
-    """保存上传文件到本地磁盘，数据库只存JSON元信息"""
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 分块写盘，每块 1MB
+
+
+async def _save_upload_stream(upload: UploadFile, filename: str, content_type: str, max_bytes: int, too_large: str) -> Dict:
+    """
+    分块把上传文件写入本地磁盘（不整体读入内存），数据库只存JSON元信息
+    超过 max_bytes 时删除已写入的部分并返回 400
+    content_type 为空时按第一块的文件头魔数推断（仅图片上传会传空）
+    """
     ext = os.path.splitext(filename or "file")[1] or ".bin"
     file_id = uuid.uuid4().hex[:12]
     safe_name = f"{file_id}{ext}"
     file_path = os.path.join(UPLOAD_DIR, safe_name)
+    size = 0
     with open(file_path, "wb") as f:
-        f.write(file_bytes)
-    print(f"[FILE SAVE] {filename} -> {safe_name} ({len(file_bytes)} bytes)")
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if size == 0 and not content_type:
+                content_type = _sniff_image_mime(chunk)
+            size += len(chunk)
+            if size > max_bytes:
+                break
+            f.write(chunk)
+    if size > max_bytes:
+        os.remove(file_path)
+        raise HTTPException(status_code=400, detail=too_large)
+    print(f"[FILE SAVE] {filename} -> {safe_name} ({size} bytes)")
     return {
         "file_path": file_path,
         "file_id": file_id,
         "filename": filename,
         "content_type": content_type,
-        "size": len(file_bytes),
+        "size": size,
     }
 
 
-def _read_saved_file(file_meta: Dict) -> Optional[bytes]:
-    """从本地磁盘读取文件"""
+def _saved_file_response(file_meta: Dict, default_type: str, default_name: str, missing_detail: str) -> FileResponse:
+    """直接从磁盘流式返回已保存文件，不整体读入内存；中文文件名按 RFC 5987 编码"""
     path = file_meta.get("file_path")
-    if path and os.path.exists(path):
-        with open(path, "rb") as f:
-            return f.read()
-    return None
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=missing_detail)
+    return FileResponse(
+        path,
+        media_type=file_meta.get("content_type") or default_type,
+        filename=file_meta.get("filename") or default_name,
+        content_disposition_type="inline",
+    )
+
+
+def _sniff_image_mime(head: bytes) -> str:
+    """按文件头魔数判断图片 MIME（PNG / WebP，其余按 JPEG 处理）"""
+    if head[:8] == b'\x89PNG\r\n\x1a\n':
+        return "image/png"
+    if head[:4] == b'RIFF':
+        return "image/webp"
+    return "image/jpeg"
+
+
+# ========== 预编译正则（模块加载时编译一次，避免每次调用重复编译）==========
+_TRAILING_COMMA_RE = re.compile(r',\s*([\]}])')
+_FLAT_OBJECT_RE = re.compile(r'\{[^{}]*\}')
+# 行首时间段标记，如 "[0-5s]:" / "5-10s："
+_TIME_RANGE_RE = re.compile(r'\s*\[?(\d+)\s*-\s*(\d+)s\]?\s*[:：]?')
+# 行内时间段标记（用于平移时间）
+_TIME_RANGE_SUB_RE = re.compile(r'\[?(\d+)\s*-\s*(\d+)s\]?\s*[:：]?')
+# 时间段标记 + 其后内容（用于转 bullet 格式）
+_TIME_RANGE_LINE_RE = re.compile(r'\[?(\d+)\s*-\s*(\d+)s\]?\s*[:：]?(.*)')
+_TRANSITION_RE = re.compile(
+    r'transition|fade to|cut to|then a|接着|然后|随后|next segment|continuing|延续',
+    re.IGNORECASE,
+)
 
 
 # ========== JSON 解析辅助函数 ==========
@@ -91,7 +140,7 @@ def _parse_ai_json_response(raw: str) -> list:
     # 4. 尝试修复常见问题
     try:
         # 移除尾随逗号
-        fixed = re.sub(r',\s*([\]}])', r'\1', json_str)
+        fixed = _TRAILING_COMMA_RE.sub(r'\1', json_str)
         return json.loads(fixed)
     except json.JSONDecodeError as e:
         print(f"[AI JSON PARSER] Fix attempt 1 failed: {e}")
@@ -106,8 +155,7 @@ def _parse_ai_json_response(raw: str) -> list:
     # 6. 最后尝试：使用正则提取对象
     try:
         # 尝试提取 {...} 模式
-        pattern = r'\{[^{}]*\}'
-        matches = re.findall(pattern, json_str)
+        matches = _FLAT_OBJECT_RE.findall(json_str)
         if matches:
             results = []
             for m in matches:
@@ -252,6 +300,20 @@ SELLING_POINT_OPTIONS = [
     "快速见效", "高端奢华", "口碑爆款", "定制服务", "送礼首选",
 ]
 
+# 每次生成最多使用的卖点数量（与前端上限一致）
+MAX_SELLING_POINTS = 6
+
+
+def _parse_selling_points(raw: str) -> List[str]:
+    """卖点字符串（英文逗号分隔，与前端 parseSellingPoints 一致）→ 去空去重后的列表，最多 MAX_SELLING_POINTS 条"""
+    points = []
+    for p in (raw or "").split(","):
+        p = p.strip()
+        if p and p not in points:
+            points.append(p)
+    return points[:MAX_SELLING_POINTS]
+
+
 # 投放市场选项 — 级联结构：国家 → 语言
 MARKET_CASCADE = {
     "singapore":    {"label": "新加坡", "languages": [{"value": "english", "label": "英语"}, {"value": "chinese", "label": "中文"}, {"value": "malay", "label": "马来语"}]},
@@ -310,6 +372,30 @@ STYLE_LABELS = [
     "搞笑反转风",
 ]
 
+# 风格关键词（用于根据提示词内容匹配风格标签）
+STYLE_KEYWORDS = {
+    "痛点解决流": ["pain", "problem", "solution", "before", "after", "fix", "repair", "痛苦", "解决", "方案"],
+    "UGC种草风": ["ugc", "user", "authentic", "real", "testimonial", "review", "用户", "真实", "测评"],
+    "产品场景展示": ["scene", "lifestyle", "context", "usage", "scenario", "场景", "生活", "使用场景"],
+    "暴力测试风": ["test", "durability", "extreme", "torture", "stress", "durable", "测试", "耐用", "极限"],
+    "情绪共鸣流": ["emotion", "feeling", "relatable", "mood", "atmospheric", "情绪", "情感", "共鸣"],
+    "极速快剪流": ["fast", "rapid", "dynamic", "energetic", "quick", "fast cut", "快剪", "动感", "快速"],
+    "高端大片风": ["cinematic", "premium", "luxury", "high-end", "film", "高端", "大片", "质感"],
+    "搞笑反转风": ["comedy", "humor", "funny", "twist", "surprise", "搞笑", "反转", "幽默"],
+}
+
+# 标签去重时使用的英文关键词子集
+STYLE_DEDUP_KEYWORDS = {
+    "痛点解决流": ["pain", "problem", "solution", "before", "after", "fix", "repair"],
+    "UGC种草风": ["ugc", "user", "authentic", "real", "testimonial", "review"],
+    "产品场景展示": ["scene", "lifestyle", "context", "usage", "scenario"],
+    "暴力测试风": ["test", "durability", "extreme", "torture", "stress"],
+    "情绪共鸣流": ["emotion", "feeling", "relatable", "mood", "atmospheric"],
+    "极速快剪流": ["fast", "rapid", "dynamic", "energetic", "quick"],
+    "高端大片风": ["cinematic", "premium", "luxury", "high-end", "film"],
+    "搞笑反转风": ["comedy", "humor", "funny", "twist", "surprise"],
+}
+
 # 每种风格的差异化模板（镜头/动作/氛围/结构）
 STYLE_TEMPLATES = {
     "痛点解决流": {
@@ -575,8 +661,6 @@ def _split_prompt_by_duration(final_prompt: str, duration_sec: int, video_model:
     - 第一个分段（0-unit）: header + 所有分镜描述(0-5s+5-10s+...+最后一段) + Transition to NNs + footer
     - 最后一个分段（unit-end）: header + 后续分镜(bullet格式) + footer + supplement
     """
-    import re
-
     unit = VIDEO_MODELS.get(video_model, VIDEO_MODELS["seedance"])["segment_unit"]
 
     if duration_sec <= unit:
@@ -611,7 +695,7 @@ def _split_prompt_by_duration(final_prompt: str, duration_sec: int, video_model:
     current_content = []
 
     for line in time_sections_raw.split('\n'):
-        range_match = re.match(r'\s*\[?(\d+)\s*-\s*(\d+)s\]?\s*[:：]?', line)
+        range_match = _TIME_RANGE_RE.match(line)
         if range_match:
             if current_range and current_content:
                 time_sections[current_range] = '\n'.join(current_content)
@@ -644,8 +728,7 @@ def _split_prompt_by_duration(final_prompt: str, duration_sec: int, video_model:
         elif tr_start >= unit:
             adjusted_lines = []
             for line in content.split('\n'):
-                adjusted = re.sub(
-                    r'\[?(\d+)\s*-\s*(\d+)s\]?\s*[:：]?',
+                adjusted = _TIME_RANGE_SUB_RE.sub(
                     lambda m: f"[{int(m.group(1)) - unit}s-{int(m.group(2)) - unit}s]:",
                     line
                 )
@@ -658,7 +741,7 @@ def _split_prompt_by_duration(final_prompt: str, duration_sec: int, video_model:
             capturing_part2 = False
 
             for line in lines:
-                tmatch = re.match(r'\s*\[?(\d+)\s*-\s*(\d+)s\]?\s*[:：]?', line)
+                tmatch = _TIME_RANGE_RE.match(line)
                 if tmatch:
                     e = int(tmatch.group(2))
                     if e <= unit:
@@ -666,8 +749,7 @@ def _split_prompt_by_duration(final_prompt: str, duration_sec: int, video_model:
                         part1_lines.append(line)
                     else:
                         capturing_part2 = True
-                        adj_line = re.sub(
-                            r'\[?(\d+)\s*-\s*(\d+)s\]?\s*[:：]?',
+                        adj_line = _TIME_RANGE_SUB_RE.sub(
                             lambda m: f"[{int(m.group(1)) - unit}s-{int(m.group(2)) - unit}s]:",
                             line
                         )
@@ -694,11 +776,8 @@ def _split_prompt_by_duration(final_prompt: str, duration_sec: int, video_model:
             stripped = line.strip()
             if not stripped:
                 continue
-            is_transition = bool(re.search(
-                r'transition|fade to|cut to|then a|接着|然后|随后|next segment|continuing|延续',
-                stripped, re.IGNORECASE
-            ))
-            is_time_marker = bool(re.match(r'\s*\[?\d+\s*-\s*\d+s\]?\s*[:：]?', stripped))
+            is_transition = bool(_TRANSITION_RE.search(stripped))
+            is_time_marker = bool(_TIME_RANGE_RE.match(stripped))
 
             if is_transition and not is_time_marker:
                 transition_parts.append(stripped)
@@ -753,7 +832,7 @@ def _split_prompt_by_duration(final_prompt: str, duration_sec: int, video_model:
                 l = l.strip()
                 if not l:
                     continue
-                tmatch = re.match(r'\[?(\d+)\s*-\s*(\d+)s\]?\s*[:：]?(.*)', l)
+                tmatch = _TIME_RANGE_LINE_RE.match(l)
                 if tmatch:
                     bullet_lines.append(f"- [{tmatch.group(1)}s-{tmatch.group(2)}s]: {tmatch.group(3).strip()}")
                 elif l.startswith('-') or l.startswith('*'):
@@ -793,7 +872,7 @@ def _build_single_prompt(params: dict, index: int, has_video: bool = False, has_
     physics = random.choice(tmpl["physics_options"])
     action = random.choice(tmpl["action_options"])
 
-    points = [p.strip() for p in params["selling_points"].split(",") if p.strip()]
+    points = _parse_selling_points(params["selling_points"])
     market_actor = MARKET_ACTORS.get(params["target_market"], MARKET_ACTORS["china"])
 
     platform = params.get("platform", "douyin")
@@ -956,6 +1035,20 @@ def _build_single_prompt(params: dict, index: int, has_video: bool = False, has_
     }
 
 
+def _build_local_prompts(params: dict, count: int, has_video: bool = False, has_image: bool = False,
+                         start_index: int = 0, used_labels: Optional[set] = None) -> list:
+    """本地批量生成提示词：优先分配未使用过的风格标签，标签不够时允许重复"""
+    used_labels = used_labels or set()
+    available = [lbl for lbl in STYLE_LABELS if lbl not in used_labels] or list(STYLE_LABELS)
+    assigned_labels = random.sample(available, min(count, len(available)))
+    while len(assigned_labels) < count:
+        assigned_labels.append(random.choice(STYLE_LABELS))
+    return [
+        _build_single_prompt(params, start_index + i, has_video, has_image, assigned_label=assigned_labels[i])
+        for i in range(count)
+    ]
+
+
 def _build_detail_supplement(params: dict, profile: dict, dur_sec: int, needed_words: int) -> str:
     """生成镜头语言和氛围补充内容（不重复已有分镜描述），确保总词数达标"""
     atmosphere_descs = [
@@ -997,35 +1090,18 @@ def _build_detail_supplement(params: dict, profile: dict, dur_sec: int, needed_w
 
 def _match_style_label(raw_label: str, final_prompt: str) -> str:
     """根据提示词内容智能匹配风格标签（不再随机）"""
-    import re
-    
-    # 1. 如果AI返回的标签有效，直接使用
-    if raw_label and raw_label in STYLE_LABELS:
+    # 1. 如果AI返回的标签有效，直接使用（模型偶尔返回非字符串，忽略即可）
+    if isinstance(raw_label, str) and raw_label in STYLE_LABELS:
         return raw_label
     
     # 2. 基于关键词匹配风格
     fp_lower = final_prompt.lower()
     
-    # 定义每种风格的关键词
-    style_keywords = {
-        "痛点解决流": ["pain", "problem", "solution", "before", "after", "fix", "repair", "痛苦", "解决", "方案"],
-        "UGC种草风": ["ugc", "user", "authentic", "real", "testimonial", "review", "用户", "真实", "测评"],
-        "产品场景展示": ["scene", "lifestyle", "context", "usage", "scenario", "场景", "生活", "使用场景"],
-        "暴力测试风": ["test", "durability", "extreme", "torture", "stress", "durable", "测试", "耐用", "极限"],
-        "情绪共鸣流": ["emotion", "feeling", "relatable", "mood", "atmospheric", "情绪", "情感", "共鸣"],
-        "极速快剪流": ["fast", "rapid", "dynamic", "energetic", "quick", "fast cut", "快剪", "动感", "快速"],
-        "高端大片风": ["cinematic", "premium", "luxury", "high-end", "film", "高端", "大片", "质感"],
-        "搞笑反转风": ["comedy", "humor", "funny", "twist", "surprise", "搞笑", "反转", "幽默"],
-    }
-    
     # 计算每种风格的匹配分数
-    scores = {}
-    for style, keywords in style_keywords.items():
-        score = 0
-        for keyword in keywords:
-            if keyword in fp_lower:
-                score += 1
-        scores[style] = score
+    scores = {
+        style: sum(1 for keyword in keywords if keyword in fp_lower)
+        for style, keywords in STYLE_KEYWORDS.items()
+    }
     
     # 返回分数最高的风格
     best_style = max(scores, key=scores.get)
@@ -1038,12 +1114,39 @@ def _match_style_label(raw_label: str, final_prompt: str) -> str:
     return best_style
 
 
+def _normalize_batch(prompts: list, params: dict, count: int, has_video: bool = False, has_image: bool = False) -> list:
+    """
+    一次AI调用批量返回 count 条结果：多余的截断，缺少的用本地引擎补齐，
+    并按顺序重新编号 index（1-based），避免为缺失的几条再发一次请求
+    """
+    prompts = [p for p in prompts if isinstance(p, dict) and p.get("finalPrompt")][:count]
+    missing = count - len(prompts)
+    if missing > 0:
+        used = {p.get("styleLabel") for p in prompts}
+        prompts.extend(_build_local_prompts(params, missing, has_video, has_image,
+                                            start_index=len(prompts), used_labels=used))
+        print(f"[GENERATE] AI只返回{count - missing}条，本地补齐{missing}条")
+    for i, p in enumerate(prompts):
+        p["index"] = i + 1
+    return prompts
+
+
+# ========== 智谱客户端（进程内复用）==========
+@lru_cache(maxsize=1)
+def _get_zhipu_client(api_key: str):
+    """
+    复用同一个 ZhipuAI 客户端：底层 HTTP 连接池保持长连接，
+    避免每次请求都重新建立 TCP+TLS 握手（按 api_key 缓存，换 key 自动重建）
+    """
+    from zhipuai import ZhipuAI
+
+    return ZhipuAI(api_key=api_key)
+
+
 # ========== AI 提示词生成 ==========
 async def _build_ai_prompts(params: dict, count: int, has_video: bool = False, has_image: bool = False) -> list:
     """调用智谱 GLM 生成提示词"""
-    from zhipuai import ZhipuAI
-
-    client = ZhipuAI(api_key=settings.ZHIPUAI_API_KEY)
+    client = _get_zhipu_client(settings.ZHIPUAI_API_KEY)
 
     points_str = params.get("selling_points") or "优质品质"
     script_str = params.get("video_script") or ""
@@ -1224,19 +1327,9 @@ async def _build_ai_prompts(params: dict, count: int, has_video: bool = False, h
         if matched_label in used_labels:
             fp_lower = fp.lower()
             # 从剩余未使用标签中按关键词分数排序，选最高分的
-            style_keywords = {
-                "痛点解决流": ["pain", "problem", "solution", "before", "after", "fix", "repair"],
-                "UGC种草风": ["ugc", "user", "authentic", "real", "testimonial", "review"],
-                "产品场景展示": ["scene", "lifestyle", "context", "usage", "scenario"],
-                "暴力测试风": ["test", "durability", "extreme", "torture", "stress"],
-                "情绪共鸣流": ["emotion", "feeling", "relatable", "mood", "atmospheric"],
-                "极速快剪流": ["fast", "rapid", "dynamic", "energetic", "quick"],
-                "高端大片风": ["cinematic", "premium", "luxury", "high-end", "film"],
-                "搞笑反转风": ["comedy", "humor", "funny", "twist", "surprise"],
-            }
             available = [lbl for lbl in STYLE_LABELS if lbl not in used_labels]
             if available:
-                best = max(available, key=lambda lbl: sum(1 for kw in style_keywords.get(lbl, []) if kw in fp_lower))
+                best = max(available, key=lambda lbl: sum(1 for kw in STYLE_DEDUP_KEYWORDS.get(lbl, []) if kw in fp_lower))
                 print(f"[AI DEDUP] 提示词{p.get('index', '?')}标签去重: '{matched_label}' → '{best}'")
                 matched_label = best
             # 如果所有标签都用完了（count > 8），允许重复
@@ -1291,18 +1384,12 @@ async def _build_ai_prompts(params: dict, count: int, has_video: bool = False, h
 # ========== AI 图片分析 ==========
 async def _analyze_product_image(image_bytes: bytes) -> dict:
     """调用智谱 GLM-4V 分析产品图片，提取产品名称、描述、卖点"""
-    from zhipuai import ZhipuAI
-
-    client = ZhipuAI(api_key=settings.ZHIPUAI_API_KEY)
+    client = _get_zhipu_client(settings.ZHIPUAI_API_KEY)
 
     # base64 编码图片
     b64 = base64.b64encode(image_bytes).decode('utf-8')
     # 探测 MIME 类型（简单判断）
-    mime = "image/jpeg"
-    if image_bytes[:8] == b'\x89PNG\r\n\x1a\n':
-        mime = "image/png"
-    elif image_bytes[:4] == b'RIFF':
-        mime = "image/webp"
+    mime = _sniff_image_mime(image_bytes)
 
     system_prompt = (
         "你是一位资深电商产品分析师。请根据上传的产品图片，分析并输出以下信息（JSON格式）：\n"
@@ -1412,8 +1499,11 @@ async def get_options():
 
 
 # ========== 生成端点（multipart/form-data）==========
-@router.post("/generate")
-async def generate_prompts(
+# 流式生成时的心跳间隔（秒）：等待AI期间定时下发一行，避免网关/浏览器判定连接空闲
+STREAM_HEARTBEAT_SEC = 10.0
+
+
+def _generate_form(
     product_name: str = Form(...),
     target_market: str = Form("china"),
     target_language: str = Form("chinese"),
@@ -1424,53 +1514,81 @@ async def generate_prompts(
     bgm_style: str = Form(""),
     audio_option: str = Form("voiceover"),
     video_model: str = Form("seedance"),
-    count: int = Form(3),
-    use_ai: bool = Form(True),
-    video: UploadFile = File(None),
-    image: UploadFile = File(None),
-    # 临时去掉登录验证，方便测试
-    # current_user: models.User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
-):
-    # 读取上传文件 → 存到本地文件系统（不存数据库 BYTEA）
-    video_meta = None
-    image_meta = None
-
-    if video:
-        video_bytes = await video.read()
-        if len(video_bytes) > 100 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="视频文件不能超过 100MB")
-        video_meta = _save_uploaded_file(video_bytes, video.filename or "video.mp4", video.content_type or "video/mp4")
-        print(f"[UPLOAD] 视频已保存: {video_meta['filename']} ({video_meta['size']} bytes)")
-
-    if image:
-        image_bytes = await image.read()
-        if len(image_bytes) > 10 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="图片文件不能超过 10MB")
-        image_meta = _save_uploaded_file(image_bytes, image.filename or "image.jpg", image.content_type or "image/jpeg")
-        print(f"[UPLOAD] 图片已保存: {image_meta['filename']} ({image_meta['size']} bytes)")
-
-    has_video = video_meta is not None
-    has_image = image_meta is not None
-
-    params = {
+) -> dict:
+    """/generate 与 /generate-stream 共用的表单参数"""
+    return {
         "product_name": product_name,
         "target_market": target_market,
         "target_language": target_language,
         "platform": platform,
         "voiceover_subtitle": voiceover_subtitle,
-        "selling_points": selling_points,
+        # 在入口处解析一次并规范化，后续生成与入库都使用同一份
+        "selling_points": ",".join(_parse_selling_points(selling_points)),
         "video_script": video_script,
         "bgm_style": bgm_style,
         "audio_option": audio_option,
         "video_model": video_model,
     }
 
-    # 获取用户历史风格权重
-    style_weights = {}
-    # （后续可从用户最近采纳记录中读取权重）
 
-    # 生成提示词 - AI模式优先（强化提示词+后处理校验），失败则fallback本地模式
+async def _store_uploads(video: Optional[UploadFile], image: Optional[UploadFile]):
+    """读取上传文件 → 存到本地文件系统（不存数据库 BYTEA），返回 (video_meta, image_meta)"""
+    video_meta = None
+    image_meta = None
+
+    if video:
+        video_meta = await _save_upload_stream(
+            video, video.filename or "video.mp4", video.content_type or "video/mp4",
+            max_bytes=100 * 1024 * 1024, too_large="视频文件不能超过 100MB",
+        )
+        print(f"[UPLOAD] 视频已保存: {video_meta['filename']} ({video_meta['size']} bytes)")
+
+    if image:
+        image_meta = await _save_upload_stream(
+            image, image.filename or "image.jpg", image.content_type or "",
+            max_bytes=10 * 1024 * 1024, too_large="图片文件不能超过 10MB",
+        )
+        print(f"[UPLOAD] 图片已保存: {image_meta['filename']} ({image_meta['size']} bytes)")
+
+    return video_meta, image_meta
+
+
+async def _resolve_uploads(video: Optional[UploadFile], image: Optional[UploadFile], source_history_id: Optional[int]):
+    """
+    重新生成时客户端只传 source_history_id，复用该记录已保存到磁盘的素材，
+    避免每次「重新生成」都把视频/图片完整重传一遍；本次有新上传的文件则以新文件为准
+    """
+    # 先确认可复用的旧素材，再写入新上传的文件：复用失败(410)时不会在磁盘上留下孤儿文件
+    reused = [None, None]
+    if source_history_id is not None and not (video and image):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(models.PromptHistory).where(models.PromptHistory.id == source_history_id)
+            )
+            history = result.scalar_one_or_none()
+        if not history:
+            raise HTTPException(status_code=410, detail="原素材记录不存在，请重新上传")
+
+        slots = ((video, history.video_filename), (image, history.image_filename))
+        for i, (upload, raw) in enumerate(slots):
+            # 本次已重新上传的槽位用新文件，旧文件是否过期无关紧要
+            if upload or not raw:
+                continue
+            try:
+                meta = json.loads(raw)
+            except (TypeError, json.JSONDecodeError):
+                meta = None
+            if not meta or not os.path.exists(meta.get("file_path") or ""):
+                raise HTTPException(status_code=410, detail="素材文件已过期（服务重启后临时文件已清除），请重新上传")
+            reused[i] = meta
+        print(f"[UPLOAD] 复用历史记录 {source_history_id} 的素材")
+
+    video_meta, image_meta = await _store_uploads(video, image)
+    return video_meta or reused[0], image_meta or reused[1]
+
+
+async def _generate_prompt_list(params: dict, count: int, use_ai: bool, has_video: bool, has_image: bool) -> list:
+    """生成提示词 - AI模式优先（强化提示词+后处理校验），失败则fallback本地模式"""
     if use_ai and settings.ZHIPUAI_API_KEY:
         try:
             # 90秒超时保护，避免智谱API响应慢导致前端120s超时
@@ -1479,15 +1597,13 @@ async def generate_prompts(
                 timeout=90.0
             )
             print(f"[GENERATE] AI生成成功，共{len(prompts)}条")
+            prompts = _normalize_batch(prompts, params, count, has_video, has_image)
         except asyncio.TimeoutError:
             import traceback
             print(f"[AI TIMEOUT] 智谱API响应超时（90s），回退本地模式")
             traceback.print_exc()
             try:
-                assigned_labels = random.sample(STYLE_LABELS, min(count, len(STYLE_LABELS)))
-                while len(assigned_labels) < count:
-                    assigned_labels.append(random.choice(STYLE_LABELS))
-                prompts = [_build_single_prompt(params, i, has_video, has_image, assigned_label=assigned_labels[i]) for i in range(count)]
+                prompts = _build_local_prompts(params, count, has_video, has_image)
                 print(f"[FALLBACK] 本地生成成功，共{len(prompts)}条（AI超时已自动回退）")
             except Exception as e2:
                 import traceback
@@ -1499,10 +1615,7 @@ async def generate_prompts(
             print(f"[AI ERROR] {e}")
             traceback.print_exc()
             try:
-                assigned_labels = random.sample(STYLE_LABELS, min(count, len(STYLE_LABELS)))
-                while len(assigned_labels) < count:
-                    assigned_labels.append(random.choice(STYLE_LABELS))
-                prompts = [_build_single_prompt(params, i, has_video, has_image, assigned_label=assigned_labels[i]) for i in range(count)]
+                prompts = _build_local_prompts(params, count, has_video, has_image)
                 print(f"[FALLBACK] 本地生成成功，共{len(prompts)}条（AI失败已自动回退）")
             except Exception as e2:
                 import traceback
@@ -1513,10 +1626,7 @@ async def generate_prompts(
         if use_ai and not settings.ZHIPUAI_API_KEY:
             print(f"[WARN] 用户选择AI模式但ZHIPUAI_API_KEY未配置，使用本地模式")
         try:
-            assigned_labels = random.sample(STYLE_LABELS, min(count, len(STYLE_LABELS)))
-            while len(assigned_labels) < count:
-                assigned_labels.append(random.choice(STYLE_LABELS))
-            prompts = [_build_single_prompt(params, i, has_video, has_image, assigned_label=assigned_labels[i]) for i in range(count)]
+            prompts = _build_local_prompts(params, count, has_video, has_image)
             print(f"[GENERATE] 本地生成成功，共{len(prompts)}条")
         except Exception as e:
             import traceback
@@ -1524,20 +1634,29 @@ async def generate_prompts(
             traceback.print_exc()
             raise HTTPException(status_code=500, detail=f"生成失败: {str(e)}")
 
-    # 保存历史记录（文件存本地，数据库只存JSON元信息）
+    # 每条提示词分配稳定 id，前端渲染/采纳/违规都按 id 定位，不依赖位置序号
+    for p in prompts:
+        p["id"] = uuid.uuid4().hex[:12]
+    return prompts
+
+
+async def _save_history(db: AsyncSession, params: dict, prompts: list,
+                        video_meta: Optional[Dict], image_meta: Optional[Dict],
+                        style_weights: Optional[Dict] = None) -> Optional[models.PromptHistory]:
+    """保存历史记录（文件存本地，数据库只存JSON元信息），失败返回 None 不阻断用户"""
     try:
         history = models.PromptHistory(
             user_id=1,  # TODO: 恢复登录后改回 current_user.id
-            product_name=product_name,
-            target_market=target_market,
-            target_language=target_language,
-            platform=platform,
-            voiceover_subtitle=voiceover_subtitle,
-            selling_points=selling_points,
-            video_script=video_script,
-            bgm_style=bgm_style,
-            audio_option=audio_option,
-            video_model=video_model,
+            product_name=params["product_name"],
+            target_market=params["target_market"],
+            target_language=params["target_language"],
+            platform=params["platform"],
+            voiceover_subtitle=params["voiceover_subtitle"],
+            selling_points=params["selling_points"],
+            video_script=params["video_script"],
+            bgm_style=params["bgm_style"],
+            audio_option=params["audio_option"],
+            video_model=params["video_model"],
             prompts_json=json.dumps(prompts, ensure_ascii=False),
             video_data=None,  # 不再存BYTEA
             video_filename=json.dumps(video_meta, ensure_ascii=False) if video_meta else None,
@@ -1553,17 +1672,95 @@ async def generate_prompts(
         await db.commit()
         await db.refresh(history)
         print(f"[DB SAVE] 历史记录保存成功, id={history.id}")
+        return history
     except Exception as db_err:
         import traceback
         print(f"[DB SAVE ERROR] {db_err}")
         traceback.print_exc()
         await db.rollback()
-        # 数据库保存失败仍返回结果，不阻断用户
-        history = None
+        return None
+
+
+@router.post("/generate")
+async def generate_prompts(
+    params: dict = Depends(_generate_form),
+    count: int = Form(3),
+    use_ai: bool = Form(True),
+    source_history_id: Optional[int] = Form(None),  # 重新生成时复用该记录的素材
+    video: UploadFile = File(None),
+    image: UploadFile = File(None),
+    # 临时去掉登录验证，方便测试
+    # current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    video_meta, image_meta = await _resolve_uploads(video, image, source_history_id)
+
+    # 获取用户历史风格权重
+    style_weights = {}
+    # （后续可从用户最近采纳记录中读取权重）
+
+    prompts = await _generate_prompt_list(params, count, use_ai, video_meta is not None, image_meta is not None)
+    history = await _save_history(db, params, prompts, video_meta, image_meta, style_weights)
 
     return {"prompts": prompts, "history_id": history.id if history else None}
 
 
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+@router.post("/generate-stream")
+async def generate_prompts_stream(
+    params: dict = Depends(_generate_form),
+    count: int = Form(3),
+    use_ai: bool = Form(True),
+    source_history_id: Optional[int] = Form(None),  # 重新生成时复用该记录的素材
+    video: UploadFile = File(None),
+    image: UploadFile = File(None),
+    # 临时去掉登录验证，方便测试
+    # current_user: models.User = Depends(get_current_user),
+):
+    """
+    流式版 /generate，返回 NDJSON（每行一个事件）：
+    - {"type": "status"}  素材已接收，开始生成
+    - {"type": "ping"}    等待AI期间的心跳
+    - {"type": "prompt", "prompt": {...}}  每条提示词单独一行
+    - {"type": "done", "history_id": ...} / {"type": "error", "detail": ...}
+    """
+    video_meta, image_meta = await _resolve_uploads(video, image, source_history_id)
+
+    async def event_stream():
+        yield _ndjson({"type": "status", "message": "素材已接收，开始生成"})
+        task = asyncio.create_task(
+            _generate_prompt_list(params, count, use_ai, video_meta is not None, image_meta is not None)
+        )
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=STREAM_HEARTBEAT_SEC)
+                if done:
+                    break
+                yield _ndjson({"type": "ping"})
+            try:
+                prompts = task.result()
+            except HTTPException as e:
+                yield _ndjson({"type": "error", "detail": e.detail})
+                return
+
+            for p in prompts:
+                yield _ndjson({"type": "prompt", "prompt": p})
+
+            # 依赖注入的 db 会话在响应开始前就已关闭，流内单独开会话保存
+            async with AsyncSessionLocal() as db:
+                history = await _save_history(db, params, prompts, video_meta, image_meta)
+            yield _ndjson({"type": "done", "history_id": history.id if history else None})
+        finally:
+            # 客户端中途断开时取消仍在进行的生成任务
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
 # ========== 文件服务端点（从本地文件系统读取）==========
 @router.get("/history/{history_id}/video")
 async def get_history_video(
@@ -1582,14 +1779,8 @@ async def get_history_video(
         video_meta = json.loads(history.video_filename)
     except (TypeError, json.JSONDecodeError):
         raise HTTPException(status_code=404, detail="视频文件信息损坏")
-    file_bytes = _read_saved_file(video_meta)
-    if not file_bytes:
-        raise HTTPException(status_code=404, detail="视频文件已过期（服务重启后临时文件已清除）")
-    return Response(
-        content=file_bytes,
-        media_type=video_meta.get("content_type", "video/mp4"),
-        headers={"Content-Disposition": f"inline; filename={video_meta.get('filename', 'video.mp4')}"},
-    )
+    return _saved_file_response(video_meta, "video/mp4", "video.mp4",
+                                "视频文件已过期（服务重启后临时文件已清除）")
 
 
 @router.get("/history/{history_id}/image")
@@ -1609,21 +1800,27 @@ async def get_history_image(
         image_meta = json.loads(history.image_filename)
     except (TypeError, json.JSONDecodeError):
         raise HTTPException(status_code=404, detail="图片文件信息损坏")
-    file_bytes = _read_saved_file(image_meta)
-    if not file_bytes:
-        raise HTTPException(status_code=404, detail="图片文件已过期（服务重启后临时文件已清除）")
-    return Response(
-        content=file_bytes,
-        media_type=image_meta.get("content_type", "image/jpeg"),
-        headers={"Content-Disposition": f"inline; filename={image_meta.get('filename', 'image.jpg')}"},
-    )
+    return _saved_file_response(image_meta, "image/jpeg", "image.jpg",
+                                "图片文件已过期（服务重启后临时文件已清除）")
 
 
 # ========== 评测端点 ==========
+def _find_prompt(prompts: list, prompt_index: int = 0, prompt_id: Optional[str] = None) -> Optional[dict]:
+    """按稳定 id 定位提示词；只有客户端没传 id（旧记录）时才回退到 1-based 序号，
+    传了 id 却找不到说明不是这条记录里的提示词，返回 None 而不是按序号猜"""
+    if prompt_id:
+        by_id = {p.get("id"): p for p in prompts if isinstance(p, dict)}
+        return by_id.get(prompt_id)
+    if 0 < prompt_index <= len(prompts):
+        return prompts[prompt_index - 1]
+    return None
+
+
 @router.post("/history/{history_id}/adopt")
 async def adopt_prompt(
     history_id: int,
-    prompt_index: int = Form(...),  # 采纳第几条提示词 (1-based)
+    prompt_index: int = Form(0),  # 采纳第几条提示词 (1-based，旧记录兼容)
+    prompt_id: Optional[str] = Form(None),  # 提示词稳定 id（优先）
     current_user: models.User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -1638,6 +1835,11 @@ async def adopt_prompt(
     if not history:
         raise HTTPException(status_code=404, detail="记录不存在")
 
+    prompts = json.loads(history.prompts_json) if history.prompts_json else []
+    p = _find_prompt(prompts, prompt_index, prompt_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="提示词不存在")
+
     history.adopted_count = (history.adopted_count or 0) + 1
 
     # 更新风格权重（采纳的风格增加权重）
@@ -1646,27 +1848,27 @@ async def adopt_prompt(
     except:
         weights = {}
 
-    prompts = json.loads(history.prompts_json) if history.prompts_json else []
-    if 0 < prompt_index <= len(prompts):
-        p = prompts[prompt_index - 1]
-        strategy = p.get("dynamicStrategy", "")
-        for token in strategy.split("+"):
-            token = token.strip()
-            if token:
-                weights[token] = weights.get(token, 1.0) * 1.2  # 采纳增加20%权重
+    strategy = p.get("dynamicStrategy", "")
+    for token in strategy.split("+"):
+        token = token.strip()
+        if token:
+            weights[token] = weights.get(token, 1.0) * 1.2  # 采纳增加20%权重
 
     history.style_weights = json.dumps(weights)
     await db.commit()
 
     # 计算采纳率
     adoption_rate = (history.adopted_count / history.generated_count * 100) if history.generated_count else 0
-    return {"ok": True, "adopted_count": history.adopted_count, "adoption_rate": round(adoption_rate, 1)}
+    # 一并返回最新统计，前端无需再请求 /stats
+    stats = await _compute_user_stats(db, current_user.id)
+    return {"ok": True, "adopted_count": history.adopted_count, "adoption_rate": round(adoption_rate, 1), "stats": stats}
 
 
 @router.post("/history/{history_id}/violation")
 async def report_violation(
     history_id: int,
-    prompt_index: int = Form(...),  # 违规的第几条
+    prompt_index: int = Form(0),  # 违规的第几条 (1-based，旧记录兼容)
+    prompt_id: Optional[str] = Form(None),  # 提示词稳定 id（优先）
     reason: str = Form(...),         # 违规原因
     current_user: models.User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
@@ -1682,9 +1884,15 @@ async def report_violation(
     if not history:
         raise HTTPException(status_code=404, detail="记录不存在")
 
+    prompts = json.loads(history.prompts_json) if history.prompts_json else []
+    p = _find_prompt(prompts, prompt_index, prompt_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="提示词不存在")
+    label = p.get("index", prompt_index)
+
     # 追加违规原因
     existing = history.violation_reason or ""
-    history.violation_reason = f"{existing};[{prompt_index}]{reason}" if existing else f"[{prompt_index}]{reason}"
+    history.violation_reason = f"{existing};[{label}]{reason}" if existing else f"[{label}]{reason}"
 
     # 降低该风格权重
     try:
@@ -1692,31 +1900,25 @@ async def report_violation(
     except:
         weights = {}
 
-    prompts = json.loads(history.prompts_json) if history.prompts_json else []
-    if 0 < prompt_index <= len(prompts):
-        p = prompts[prompt_index - 1]
-        strategy = p.get("dynamicStrategy", "")
-        for token in strategy.split("+"):
-            token = token.strip()
-            if token:
-                weights[token] = weights.get(token, 1.0) * 0.6  # 违规降低40%权重
+    strategy = p.get("dynamicStrategy", "")
+    for token in strategy.split("+"):
+        token = token.strip()
+        if token:
+            weights[token] = weights.get(token, 1.0) * 0.6  # 违规降低40%权重
 
     history.style_weights = json.dumps(weights)
     await db.commit()
 
-    return {"ok": True, "violation_reason": history.violation_reason, "message": "违规已记录，原因将作为后续生成的前置约束条件"}
+    stats = await _compute_user_stats(db, current_user.id)
+    return {"ok": True, "violation_reason": history.violation_reason, "message": "违规已记录，原因将作为后续生成的前置约束条件", "stats": stats}
 
 
 # ========== 评测统计端点 ==========
-@router.get("/stats")
-async def get_user_stats(
-    current_user: models.User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
-):
-    """获取用户评测统计：采纳率、违规率、质量率"""
+async def _compute_user_stats(db: AsyncSession, user_id: int) -> dict:
+    """汇总最近 100 次生成的评测统计（/stats 与采纳/违规响应共用）"""
     result = await db.execute(
         select(models.PromptHistory).where(
-            models.PromptHistory.user_id == current_user.id,
+            models.PromptHistory.user_id == user_id,
         ).order_by(desc(models.PromptHistory.created_at)).limit(100)
     )
     histories = result.scalars().all()
@@ -1752,6 +1954,15 @@ async def get_user_stats(
     }
 
 
+@router.get("/stats")
+async def get_user_stats(
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """获取用户评测统计：采纳率、违规率、质量率"""
+    return await _compute_user_stats(db, current_user.id)
+
+
 # ========== 历史记录 ==========
 @router.get("/history")
 async def get_history(
@@ -1,10 +1,14 @@
+import { lazy, Suspense } from 'react'
 import { BrowserRouter, Routes, Route } from 'react-router-dom'
 import { AuthProvider } from './context/AuthContext'
 import Layout from './components/Layout'
+import PageLoading from './components/PageLoading'
 import LoginPage from './pages/LoginPage'
 import GeneratorPage from './pages/GeneratorPage'
-import HistoryPage from './pages/HistoryPage'
-import SharePage from './pages/SharePage'
+
+// 非首屏页面按需加载，首次打开只下载登录页和生成页的代码
+const HistoryPage = lazy(() => import('./pages/HistoryPage'))
+const SharePage = lazy(() => import('./pages/SharePage'))
 
 export default function App() {
   return (
@@ -12,7 +16,8 @@ export default function App() {
       <BrowserRouter>
         <Routes>
           <Route path="/login" element={<LoginPage />} />
-          <Route path="/share/:token" element={<SharePage />} />
+          <Route path="/share/:token" element={<Suspense fallback={<PageLoading />}><SharePage /></Suspense>} />
+          {/* Layout 内部在 Outlet 外包 Suspense：懒加载时只替换内容区，侧边栏保持不动 */}
           <Route element={<Layout />}>
             <Route path="/" element={<GeneratorPage />} />
             <Route path="/history" element={<HistoryPage />} />
@@ -3,7 +3,7 @@ import axios from 'axios'
 // 生产环境：直连 Railway 后端
 // 开发环境：Vite proxy 转发到 localhost:8000
 const isLocalhost = window.location.hostname === 'localhost' || window.location.hostname === '127.0.0.1'
-const apiBase = isLocalhost
+export const apiBase = isLocalhost
   ? '/api'
   : 'https://incredible-alignment-production-4ba5.up.railway.app/api'
 
@@ -18,9 +18,28 @@ api.interceptors.request.use((config) => {
   return config
 })
 
+// 网关瞬时错误重试（Railway 冷启动/重新部署时常见 502/503/504）
+// 只重试幂等的 GET 请求，指数退避 0.5s → 1s → 2s
+const RETRY_STATUS = [502, 503, 504]
+const MAX_RETRIES = 3
+const RETRY_BASE_DELAY = 500
+
+const shouldRetry = (err) => {
+  const config = err.config
+  if (!config || config.method !== 'get') return false
+  if ((config.__retryCount || 0) >= MAX_RETRIES) return false
+  return RETRY_STATUS.includes(err.response?.status)
+}
+
 api.interceptors.response.use(
   (res) => res,
-  (err) => {
+  async (err) => {
+    if (shouldRetry(err)) {
+      const config = err.config
+      config.__retryCount = (config.__retryCount || 0) + 1
+      await new Promise(r => setTimeout(r, RETRY_BASE_DELAY * 2 ** (config.__retryCount - 1)))
+      return api(config)
+    }
     if (err.response?.status === 401) {
       localStorage.removeItem('token')
       localStorage.removeItem('user')
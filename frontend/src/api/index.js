@@ -1,4 +1,4 @@
-import api from './client'
+import api, { apiBase } from './client'
 
 export const authApi = {
   register: (data) => api.post('/auth/register', data),
@@ -23,11 +23,51 @@ export const promptApi = {
     timeout: 60000,
   }),
 
-  // 生成提示词（multipart/form-data，支持文件上传）
-  generate: (formData) => api.post('/prompts/generate', formData, {
-    headers: { 'Content-Type': 'multipart/form-data' },
-    timeout: 120000,  // 文件上传需更长超时
-  }),
+  // 流式生成（NDJSON 逐行推送）：上传阶段不设总超时，响应开始后按空闲时间判断超时
+  // （后端等待AI期间每10s发送心跳，超过 idleTimeout 未收到任何数据才中止）
+  generateStream: async (formData, onEvent, { idleTimeout = 60000 } = {}) => {
+    const controller = new AbortController()
+    let idleTimer = null
+    const resetIdle = () => {
+      clearTimeout(idleTimer)
+      idleTimer = setTimeout(() => controller.abort(), idleTimeout)
+    }
+    const token = localStorage.getItem('token')
+    try {
+      const res = await fetch(`${apiBase}/prompts/generate-stream`, {
+        method: 'POST',
+        body: formData,
+        headers: token ? { Authorization: `Bearer ${token}` } : {},
+        signal: controller.signal,
+      })
+      if (!res.ok) {
+        const data = await res.json().catch(() => ({}))
+        const err = new Error(typeof data.detail === 'string' ? data.detail : `请求失败 (${res.status})`)
+        err.status = res.status
+        err.detail = data.detail
+        throw err
+      }
+      const reader = res.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      resetIdle()
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        resetIdle()
+        buffer += decoder.decode(value, { stream: true })
+        let nl
+        while ((nl = buffer.indexOf('\n')) >= 0) {
+          const line = buffer.slice(0, nl).trim()
+          buffer = buffer.slice(nl + 1)
+          if (line) onEvent(JSON.parse(line))
+        }
+      }
+      if (buffer.trim()) onEvent(JSON.parse(buffer))
+    } finally {
+      clearTimeout(idleTimer)
+    }
+  },
 
   // 历史记录
   getHistory: (page = 1) => api.get(`/prompts/history?page=${page}`),
@@ -39,16 +79,18 @@ export const promptApi = {
   getHistoryImage: (id) => api.get(`/prompts/history/${id}/image`, { responseType: 'blob' }),
 
   // 采纳提示词
-  adopt: (id, promptIndex) => {
+  adopt: (id, promptIndex, promptId) => {
     const form = new URLSearchParams()
     form.append('prompt_index', promptIndex)
+    if (promptId) form.append('prompt_id', promptId)
     return api.post(`/prompts/history/${id}/adopt`, form)
   },
 
   // 报告违规
-  reportViolation: (id, promptIndex, reason) => {
+  reportViolation: (id, promptIndex, reason, promptId) => {
     const form = new URLSearchParams()
     form.append('prompt_index', promptIndex)
+    if (promptId) form.append('prompt_id', promptId)
     form.append('reason', reason)
     return api.post(`/prompts/history/${id}/violation`, form)
   },
@@ -56,6 +98,9 @@ export const promptApi = {
   // 获取评测统计
   getStats: () => api.get('/prompts/stats'),
 
+  // 检查 AI 服务是否可用
+  checkAi: () => api.get('/prompts/check-ai'),
+
   // 分享
   createShareLink: (id) => api.post(`/prompts/history/${id}/share`),
   getShared: (token) => api.get(`/prompts/share/${token}`),
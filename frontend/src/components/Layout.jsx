@@ -1,5 +1,7 @@
+import { Suspense } from 'react'
 import { NavLink, Outlet, Navigate } from 'react-router-dom'
 import { useAuth } from '../context/AuthContext'
+import PageLoading from './PageLoading'
 
 export default function Layout() {
   const { user, logout } = useAuth()
@@ -27,7 +29,9 @@ export default function Layout() {
         </div>
       </aside>
       <main className="main-content">
-        <Outlet />
+        <Suspense fallback={<PageLoading />}>
+          <Outlet />
+        </Suspense>
       </main>
     </div>
   )
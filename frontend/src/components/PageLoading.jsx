@@ -0,0 +1,9 @@
+// 懒加载页面下载期间的占位
+export default function PageLoading() {
+  return (
+    <div className="page-loading">
+      <div className="spinner" />
+      <div>加载中...</div>
+    </div>
+  )
+}
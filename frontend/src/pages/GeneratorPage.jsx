@@ -1,5 +1,6 @@
-import { useState, useRef, useEffect } from 'react'
+import { useState, useRef, useEffect, useCallback, useMemo, memo } from 'react'
 import { promptApi } from '../api'
+import { copyText } from '../utils/clipboard'
 
 // ========== 平台配置 ==========
 const PLATFORM_OPTIONS = {
@@ -62,6 +63,10 @@ const VIDEO_MODELS = {
 }
 
 const SELLING_POINT_PRESETS = []  // 预设卖点已移除，全部由AI推荐
+const MAX_SELLING_POINTS = 6  // 与后端上限一致
+
+// 解析已选卖点（英文逗号分隔字符串 → 去重数组），分隔规则与后端 _parse_selling_points 一致
+const parseSellingPoints = (raw) => [...new Set((raw || '').split(',').map(s => s.trim()).filter(Boolean))]
 
 // 级联市场数据 — 国家 → 语言
 const MARKET_CASCADE = {
@@ -94,6 +99,39 @@ const MARKET_CASCADE = {
   global:       { label: '全球', languages: [{ value: 'english', label: '英语' }] },
 }
 
+// ========== 图片缩略图 ==========
+// AI分析只需要看清产品，原图（最大10MB）缩放到 1280px 以内再上传，
+// 按 File 对象缓存，「重新分析」时直接复用，不再重复解码/压缩
+const THUMBNAIL_MAX_EDGE = 1280
+const thumbnailCache = new WeakMap()
+
+const makeThumbnail = (file) => {
+  if (thumbnailCache.has(file)) return thumbnailCache.get(file)
+  const task = createImageBitmap(file)
+    .then(bitmap => {
+      const scale = Math.min(1, THUMBNAIL_MAX_EDGE / Math.max(bitmap.width, bitmap.height))
+      if (scale === 1 && file.size <= 1024 * 1024) {
+        bitmap.close()
+        return file
+      }
+      const canvas = document.createElement('canvas')
+      canvas.width = Math.round(bitmap.width * scale)
+      canvas.height = Math.round(bitmap.height * scale)
+      const ctx = canvas.getContext('2d')
+      ctx.fillStyle = '#fff'  // PNG 透明背景转 JPEG 时填白
+      ctx.fillRect(0, 0, canvas.width, canvas.height)
+      ctx.drawImage(bitmap, 0, 0, canvas.width, canvas.height)
+      bitmap.close()
+      return new Promise(resolve => canvas.toBlob(blob => {
+        const name = file.name.replace(/\.[^.]+$/, '') + '.jpg'
+        resolve(blob ? new File([blob], name, { type: 'image/jpeg' }) : file)
+      }, 'image/jpeg', 0.8))
+    })
+    .catch(() => file)  // 浏览器不支持或解码失败时退回原图
+  thumbnailCache.set(file, task)
+  return task
+}
+
 // ========== 步骤定义 ==========
 const STEPS = [
   { key: 'upload', label: '上传素材', icon: '📤' },
@@ -102,6 +140,119 @@ const STEPS = [
   { key: 'generate', label: '生成提示词', icon: '🚀' },
 ]
 
+// ========== 合并导出 ==========
+// 所有方案（含分段）拼成一份文本，一次复制/下载，不用逐段点
+function buildCombinedText(prompts) {
+  return prompts.map((p, i) => {
+    const title = `--- 方案 ${p.index || i + 1}${p.styleLabel ? ` · ${p.styleLabel}` : ''} ---`
+    const groups = p.promptGroups || []
+    const lines = [title, p.finalPrompt || '']
+    if (groups.length > 1) {
+      groups.forEach((g, gi) => {
+        const seg = typeof g === 'object'
+          ? `[片段 ${gi + 1}] ${g.startTime}s - ${g.endTime}s\n${g.prompt}`
+          : `[片段 ${gi + 1}]\n${g}`
+        lines.push('', seg)
+      })
+    }
+    return lines.join('\n')
+  }).join('\n\n')
+}
+
+function downloadText(text, filename) {
+  const url = URL.createObjectURL(new Blob([text], { type: 'text/plain;charset=utf-8' }))
+  const a = document.createElement('a')
+  a.href = url
+  a.download = filename
+  // Firefox/Safari 需要锚点在文档里才会触发下载；同步 revoke 会让下载被取消，延后释放
+  document.body.appendChild(a)
+  a.click()
+  a.remove()
+  setTimeout(() => URL.revokeObjectURL(url), 1000)
+}
+
+// ========== 结果卡片 ==========
+// memo：只有该卡片自己的数据/复制状态变化时才重新渲染，
+// 在违规弹窗等输入框里打字不会带着所有长提示词一起重绘。
+// copiedPart 只传本卡片的复制状态（'prompt' / 分段序号 / null），其它卡片复制时本卡不重绘。
+// 分段列表默认收起只显示完整提示词，点开才渲染；整批导出走上方「复制全部 / 下载 TXT」
+const ResultCard = memo(function ResultCard({ p, idx, copiedPart, saved, videoModel, profile, onCopy, onAdopt, onViolation }) {
+  const groups = p.promptGroups || []
+  const isStructured = groups.length > 0 && typeof groups[0] === 'object'
+  const modelUnit = p.segmentUnit || VIDEO_MODELS[videoModel]?.segmentUnit || 15
+  const modelLabel = VIDEO_MODELS[p.videoModel]?.label || VIDEO_MODELS[videoModel]?.label || ''
+  // 复制状态按稳定 id 记录，重新生成后旧状态不会串到新方案上
+  const key = p.id || idx
+  const [showSegments, setShowSegments] = useState(false)
+
+  return (
+    <div className="result-card">
+      <div className="result-card-header">
+        <span className="result-badge">{p.styleLabel || `方案 ${p.index || idx + 1}`}</span>
+        <div className="result-actions">
+          <button className="action-btn adopt" disabled={!saved} onClick={() => onAdopt(p.index || idx + 1, p.id)} title="采纳此方案">👍 采纳</button>
+          <button className="action-btn violation" disabled={!saved} onClick={() => onViolation(p.index || idx + 1, p.id)} title="报告违规">⚠️ 违规</button>
+          <button className="copy-btn-sm" onClick={() => onCopy(key, 'prompt', p.finalPrompt)}>
+            {copiedPart === 'prompt' ? '✓ 已复制' : '📋 复制'}
+          </button>
+        </div>
+      </div>
+      {p.audit && <div className="result-meta-line"><span className="meta-audit">🛡️ {p.audit}</span></div>}
+      {p.audioPlan && <div className="result-meta-line"><span className="meta-audio">🎧 {p.audioPlan}</span></div>}
+      {p.dynamicStrategy && <div className="result-meta-line"><span className="meta-dynamic">⚡ {p.dynamicStrategy}</span></div>}
+
+      {/* 分组分段展示 — 竖列排列视频片段 */}
+      {groups.length > 1 ? (
+        <div className="prompt-groups">
+          <div className="groups-header">
+            📑 {modelLabel}：共 {groups.length} 个分段（{modelUnit}s/段），按顺序传给模型，竖列输出视频
+            <button className="copy-btn-sm groups-toggle" onClick={() => setShowSegments(v => !v)}>
+              {showSegments ? '收起分段' : '展开分段'}
+            </button>
+          </div>
+          {showSegments ? (
+            <div className="video-segments">
+              {groups.map((g, gi) => {
+                const segPrompt = isStructured ? g.prompt : g
+                const segStart = isStructured ? g.startTime : gi * modelUnit
+                const segEnd = isStructured ? g.endTime : Math.min((gi + 1) * modelUnit, parseInt(profile.duration))
+                const segDur = isStructured ? g.duration : (segEnd - segStart)
+                return (
+                  <div key={gi} className="video-segment">
+                    <div className="segment-header">
+                      <span className="segment-order">片段 {gi + 1}</span>
+                      <span className="segment-time">{segStart}s - {segEnd}s</span>
+                      <span className="segment-duration">{segDur}s</span>
+                    </div>
+                    <div className="segment-body">
+                      <div className="segment-video-placeholder">
+                        <div className="svp-icon">🎬</div>
+                        <div className="svp-text">视频 {gi + 1}</div>
+                        <div className="svp-hint">{segDur}s · {profile.orientation}</div>
+                      </div>
+                      <div className="segment-prompt">
+                        <div className="segment-prompt-label">提示词</div>
+                        <div className="segment-prompt-text">{segPrompt}</div>
+                      </div>
+                    </div>
+                    <button className="copy-btn-sm segment-copy" onClick={() => onCopy(key, gi, segPrompt)}>
+                      {copiedPart === gi ? '✓ 已复制' : '📋 复制此段'}
+                    </button>
+                  </div>
+                )
+              })}
+            </div>
+          ) : (
+            <div className="result-prompt-text">{p.finalPrompt}</div>
+          )}
+        </div>
+      ) : (
+        <div className="result-prompt-text">{p.finalPrompt}</div>
+      )}
+    </div>
+  )
+})
+
 export default function GeneratorPage() {
   const [step, setStep] = useState(0)
   const [form, setForm] = useState({
@@ -126,10 +277,10 @@ export default function GeneratorPage() {
   const [historyId, setHistoryId] = useState(null)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
-  const [copied, setCopied] = useState({})
+  const [copied, setCopied] = useState(null) // {key, part}：同一时刻只高亮最近一次复制
   const [customSellingPoint, setCustomSellingPoint] = useState('')
   const [customMarket, setCustomMarket] = useState('')
-  const [violationModal, setViolationModal] = useState(null) // {promptIndex, historyId}
+  const [violationModal, setViolationModal] = useState(null) // {promptIndex, promptId, historyId}
   const [violationReason, setViolationReason] = useState('')
   const [stats, setStats] = useState(null)
 
@@ -145,11 +296,17 @@ export default function GeneratorPage() {
 
   const videoInputRef = useRef(null)
   const imageInputRef = useRef(null)
+  // 上一次成功上传的素材：重新生成时素材未变，直接复用后端已保存的文件，不再重复上传
+  const lastUploadRef = useRef(null) // {videoFile, imageFile, historyId}
 
   const update = (key, val) => setForm(f => ({ ...f, [key]: val }))
 
   const currentProfile = PLATFORM_PROFILES[form.platform] || PLATFORM_PROFILES.douyin
 
+  // 已选卖点只在字符串变化时解析一次，渲染和各操作共用
+  const selectedPoints = useMemo(() => parseSellingPoints(form.selling_points), [form.selling_points])
+  const combinedText = useMemo(() => buildCombinedText(prompts), [prompts])
+
   const getCurrentCategory = () => {
     for (const [catKey, cat] of Object.entries(PLATFORM_OPTIONS)) {
       if (cat.platforms.some(p => p.value === form.platform)) return catKey
@@ -167,12 +324,9 @@ export default function GeneratorPage() {
   // 加载评测统计 + AI 状态检查
   useEffect(() => {
     promptApi.getStats().then(res => setStats(res.data)).catch(() => {})
-    // 检查 AI 是否可用
-    const isLocal = window.location.hostname === 'localhost' || window.location.hostname === '127.0.0.1'
-    const base = isLocal ? '/api' : 'https://incredible-alignment-production-4ba5.up.railway.app/api'
-    fetch(`${base}/prompts/check-ai`)
-      .then(r => r.json())
-      .then(d => setAiAvailable(d.ai_available))
+    // 检查 AI 是否可用（走共享 axios 实例，网关错误自动重试）
+    promptApi.checkAi()
+      .then(res => setAiAvailable(res.data.ai_available))
       .catch(() => setAiAvailable(false))
   }, [])
 
@@ -193,7 +347,7 @@ export default function GeneratorPage() {
     setError('')
     try {
       const fd = new FormData()
-      fd.append('image', file)
+      fd.append('image', await makeThumbnail(file))
       const res = await promptApi.analyzeImage(fd)
       setAiAnalysis(res.data)
       // 自动填充产品名称（如果用户还没填）
@@ -257,11 +411,12 @@ export default function GeneratorPage() {
 
   // 卖点选择
   const toggleSellingPoint = (point) => {
-    const current = form.selling_points ? form.selling_points.split(',').map(s => s.trim()).filter(Boolean) : []
-    if (current.includes(point)) {
-      update('selling_points', current.filter(p => p !== point).join(','))
+    if (selectedPoints.includes(point)) {
+      update('selling_points', selectedPoints.filter(p => p !== point).join(','))
+    } else if (selectedPoints.length >= MAX_SELLING_POINTS) {
+      setError(`最多选择 ${MAX_SELLING_POINTS} 个卖点`)
     } else {
-      update('selling_points', [...current, point].join(','))
+      update('selling_points', [...selectedPoints, point].join(','))
     }
   }
 
@@ -274,9 +429,8 @@ export default function GeneratorPage() {
     oldPoints[index] = newValue
     setAiAnalysis({ ...aiAnalysis, selling_points: oldPoints })
     // 更新已选卖点（如果旧值被选中了，替换为新值）
-    const current = form.selling_points ? form.selling_points.split(',').map(s => s.trim()).filter(Boolean) : []
-    if (current.includes(oldValue)) {
-      const updated = current.map(p => p === oldValue ? newValue : p)
+    if (selectedPoints.includes(oldValue)) {
+      const updated = selectedPoints.map(p => p === oldValue ? newValue : p)
       update('selling_points', updated.join(','))
     }
   }
@@ -289,15 +443,17 @@ export default function GeneratorPage() {
     oldPoints.splice(index, 1)
     setAiAnalysis({ ...aiAnalysis, selling_points: oldPoints })
     // 从已选中移除
-    const current = form.selling_points ? form.selling_points.split(',').map(s => s.trim()).filter(Boolean) : []
-    update('selling_points', current.filter(p => p !== removed).join(','))
+    update('selling_points', selectedPoints.filter(p => p !== removed).join(','))
   }
 
   const addCustomSellingPoint = () => {
     if (!customSellingPoint.trim()) return
-    const current = form.selling_points ? form.selling_points.split(',').map(s => s.trim()).filter(Boolean) : []
-    if (!current.includes(customSellingPoint.trim())) {
-      update('selling_points', [...current, customSellingPoint.trim()].join(','))
+    if (selectedPoints.length >= MAX_SELLING_POINTS) {
+      setError(`最多选择 ${MAX_SELLING_POINTS} 个卖点`)
+      return
+    }
+    if (!selectedPoints.includes(customSellingPoint.trim())) {
+      update('selling_points', [...selectedPoints, customSellingPoint.trim()].join(','))
     }
     setCustomSellingPoint('')
   }
@@ -331,41 +487,82 @@ export default function GeneratorPage() {
     setError('')
     setLoading(true)
     setPrompts([])
+    // 清掉上一轮的记录ID：新一轮 done 之前不能把采纳/违规记到旧记录上
+    setHistoryId(null)
     try {
-      const fd = new FormData()
-      // 文本字段
-      fd.append('product_name', form.product_name)
-      fd.append('target_market', form.target_market)
-      fd.append('target_language', form.target_language)
-      fd.append('platform', form.platform)
-      fd.append('voiceover_subtitle', form.voiceover_subtitle)
-      fd.append('selling_points', form.selling_points)
-      fd.append('video_script', form.video_script)
-      fd.append('bgm_style', form.bgm_style)
-      fd.append('audio_option', form.audio_option)
-      fd.append('video_model', form.video_model)
-      fd.append('count', form.count)
-      fd.append('use_ai', form.use_ai)
-      // 文件
-      if (videoFile) fd.append('video', videoFile)
-      if (imageFile) fd.append('image', imageFile)
-
-      const res = await promptApi.generate(fd)
-      setPrompts(res.data.prompts)
-      setHistoryId(res.data.history_id)
+      const buildFormData = (sourceHistoryId) => {
+        const fd = new FormData()
+        // 文本字段
+        fd.append('product_name', form.product_name)
+        fd.append('target_market', form.target_market)
+        fd.append('target_language', form.target_language)
+        fd.append('platform', form.platform)
+        fd.append('voiceover_subtitle', form.voiceover_subtitle)
+        fd.append('selling_points', selectedPoints.join(','))
+        fd.append('video_script', form.video_script)
+        fd.append('bgm_style', form.bgm_style)
+        fd.append('audio_option', form.audio_option)
+        fd.append('video_model', form.video_model)
+        fd.append('count', form.count)
+        fd.append('use_ai', form.use_ai)
+        // 文件（复用上次素材时只传记录ID）
+        if (sourceHistoryId) {
+          fd.append('source_history_id', sourceHistoryId)
+        } else {
+          if (videoFile) fd.append('video', videoFile)
+          if (imageFile) fd.append('image', imageFile)
+        }
+        return fd
+      }
+
+      // 流式接收：每条提示词到达即渲染，不必等待全部完成
+      // history_id 可能为 null（数据库保存失败仍返回结果），是否收到 done 要单独记
+      let gotDone = false
+      let newHistoryId = null
+      const onEvent = (event) => {
+        if (event.type === 'prompt') {
+          setPrompts(ps => [...ps, event.prompt])
+        } else if (event.type === 'done') {
+          gotDone = true
+          newHistoryId = event.history_id
+          setHistoryId(event.history_id)
+        } else if (event.type === 'error') {
+          const err = new Error(typeof event.detail === 'string' ? event.detail : '生成失败')
+          err.detail = event.detail
+          throw err
+        }
+      }
+
+      // 只有确实选了素材、且与上次完全相同时才复用；都没选时 null === null 不算“相同”
+      const last = lastUploadRef.current
+      const reuseId = (videoFile || imageFile) && last && last.historyId
+        && last.videoFile === videoFile && last.imageFile === imageFile
+        ? last.historyId : null
+      const runStream = async (sourceHistoryId) => {
+        await promptApi.generateStream(buildFormData(sourceHistoryId), onEvent)
+        // 连接被代理/进程中断时流会直接结束，没有 done 也没有 error
+        if (!gotDone) throw new Error('生成中断，结果未保存，请重试')
+      }
+      try {
+        await runStream(reuseId)
+      } catch (err) {
+        if (!reuseId || err.status !== 410) throw err
+        // 后端素材已过期（服务重启会清空临时文件），改为完整上传
+        await runStream(null)
+      }
+      lastUploadRef.current = { videoFile, imageFile, historyId: newHistoryId }
     } catch (err) {
       // 详细错误日志
       console.error('[GENERATE ERROR]', err)
-      console.error('[RESPONSE]', err.response?.status, err.response?.data)
-      console.error('[REQUEST]', err.config?.url, err.message)
-      const detail = err.response?.data?.detail
+      console.error('[RESPONSE]', err.status, err.detail)
+      const detail = err.detail
       if (typeof detail === 'string') {
         setError(detail)
       } else if (detail) {
         setError(JSON.stringify(detail))
-      } else if (err.response) {
-        setError(`请求失败 (${err.response.status}): ${err.statusText}`)
-      } else if (err.code === 'ECONNABORTED' || err.message?.includes('timeout')) {
+      } else if (err.status) {
+        setError(err.message)
+      } else if (err.name === 'AbortError') {
         setError('请求超时，请检查网络或稍后重试')
       } else {
         setError('生成失败，请重试: ' + (err.message || '未知错误'))
@@ -375,40 +572,44 @@ export default function GeneratorPage() {
     }
   }
 
-  const handleCopy = async (idx, text) => {
+  const handleCopy = useCallback(async (key, part, text) => {
     try {
-      await navigator.clipboard.writeText(text)
-      setCopied(c => ({ ...c, [idx]: true }))
-      setTimeout(() => setCopied(c => ({ ...c, [idx]: false })), 2000)
+      await copyText(text)
+      const mark = { key, part }
+      setCopied(mark)
+      // 2 秒后只清除自己这次的标记，期间又复制了别的就不动
+      setTimeout(() => setCopied(c => (c === mark ? null : c)), 2000)
     } catch {
       alert('复制失败，请手动选择文本')
     }
-  }
+  }, [])
 
   // 采纳
-  const handleAdopt = async (promptIndex) => {
+  const handleAdopt = useCallback(async (promptIndex, promptId) => {
     if (!historyId) return
     try {
-      await promptApi.adopt(historyId, promptIndex)
+      const res = await promptApi.adopt(historyId, promptIndex, promptId)
       alert(`✅ 方案 ${promptIndex} 已采纳！风格权重已提升`)
-      // 刷新统计
-      const res = await promptApi.getStats()
-      setStats(res.data)
+      // 响应里已带最新统计，无需再请求一次
+      if (res.data.stats) setStats(res.data.stats)
     } catch (err) {
       alert('采纳失败：' + (err.response?.data?.detail || '请重试'))
     }
-  }
+  }, [historyId])
+
+  const openViolation = useCallback((promptIndex, promptId) => {
+    setViolationModal({ promptIndex, promptId, historyId })
+  }, [historyId])
 
   // 违规
   const handleViolation = async () => {
     if (!violationModal || !violationReason.trim()) return
     try {
-      await promptApi.reportViolation(violationModal.historyId, violationModal.promptIndex, violationReason)
+      const res = await promptApi.reportViolation(violationModal.historyId, violationModal.promptIndex, violationReason, violationModal.promptId)
       alert(`⚠️ 方案 ${violationModal.promptIndex} 已标记违规。原因将作为后续生成的前置约束。`)
       setViolationModal(null)
       setViolationReason('')
-      const res = await promptApi.getStats()
-      setStats(res.data)
+      if (res.data.stats) setStats(res.data.stats)
     } catch (err) {
       alert('操作失败：' + (err.response?.data?.detail || '请重试'))
     }
@@ -470,7 +671,7 @@ export default function GeneratorPage() {
               <input ref={videoInputRef} type="file" accept="video/mp4,video/quicktime,video/webm" style={{ display: 'none' }} onChange={handleVideoSelect} />
               {videoPreview ? (
                 <div className="upload-preview">
-                  <video src={videoPreview} controls style={{ width: '100%', borderRadius: 8, maxHeight: 200 }} />
+                  <video src={videoPreview} controls className="upload-preview-media" />
                   <div className="upload-file-info">
                     <span>📹 {videoFile?.name}</span>
                     <span className="upload-file-size">{videoFile ? (videoFile.size / 1024 / 1024).toFixed(1) + ' MB' : ''}</span>
@@ -492,18 +693,17 @@ export default function GeneratorPage() {
               <input ref={imageInputRef} type="file" accept="image/jpeg,image/png,image/webp" style={{ display: 'none' }} onChange={handleImageSelect} />
               {imagePreview ? (
                 <div className="upload-preview">
-                  <img src={imagePreview} alt="产品图片" style={{ width: '100%', borderRadius: 8, maxHeight: 200, objectFit: 'contain' }} />
+                  <img src={imagePreview} alt="产品图片" className="upload-preview-media" />
                   <div className="upload-file-info">
                     <span>🖼️ {imageFile?.name}</span>
                     <span className="upload-file-size">{imageFile ? (imageFile.size / 1024 / 1024).toFixed(1) + ' MB' : ''}</span>
-                    {aiAnalysis && <span className="upload-ai-status" style={{ color: '#4ade80', marginLeft: 8 }}>✅ AI已分析</span>}
-                    {(!aiAnalysis && !analyzing) && <span className="upload-ai-status" style={{ color: '#f87171', marginLeft: 8 }}>⚠️ 未分析</span>}
-                    {analyzing && <span className="upload-ai-status" style={{ color: '#fbbf24', marginLeft: 8 }}>🔄 AI分析中...</span>}
+                    {aiAnalysis && <span className="upload-ai-status done">✅ AI已分析</span>}
+                    {(!aiAnalysis && !analyzing) && <span className="upload-ai-status pending">⚠️ 未分析</span>}
+                    {analyzing && <span className="upload-ai-status running">🔄 AI分析中...</span>}
                   </div>
-                  <div style={{ display: 'flex', gap: 8, marginTop: 6 }}>
+                  <div className="upload-preview-actions">
                     {!analyzing && imageFile && (
-                      <button className="upload-btn-retry" onClick={() => doAnalyzeImage(imageFile)}
-                        style={{ fontSize: 12, padding: '4px 12px', borderRadius: 6, border: '1px solid #4ade80', background: 'transparent', color: '#4ade80', cursor: 'pointer' }}>
+                      <button className="upload-btn-retry" onClick={() => doAnalyzeImage(imageFile)}>
                         🔄 重新分析
                       </button>
                     )}
@@ -649,7 +849,7 @@ export default function GeneratorPage() {
             )}
             <div className="sp-ai-list">
               {aiAnalysis?.selling_points?.map((p, i) => {
-                const isSelected = (form.selling_points || '').split(',').map(s => s.trim()).includes(p)
+                const isSelected = selectedPoints.includes(p)
                 return (
                   <div key={i} className={`sp-ai-row ${isSelected ? 'selected' : ''}`}>
                     <button className={`sp-ai-check ${isSelected ? 'checked' : ''}`} onClick={() => toggleSellingPoint(p)}>
@@ -669,10 +869,10 @@ export default function GeneratorPage() {
               <input value={customSellingPoint} onChange={e => setCustomSellingPoint(e.target.value)} placeholder="添加自定义卖点..." onKeyDown={e => e.key === 'Enter' && addCustomSellingPoint()} />
               <button className="add-btn" onClick={addCustomSellingPoint}>+ 添加</button>
             </div>
-            {form.selling_points && (
+            {selectedPoints.length > 0 && (
               <div className="selected-tags">
-                <span className="tag-label">已选：</span>
-                {form.selling_points.split(',').map(s => s.trim()).filter(Boolean).map((s, i) => (
+                <span className="tag-label">已选 {selectedPoints.length}/{MAX_SELLING_POINTS}：</span>
+                {selectedPoints.map((s, i) => (
                   <span key={i} className="tag">{s} <span className="tag-x" onClick={() => toggleSellingPoint(s)}>✕</span></span>
                 ))}
               </div>
@@ -801,72 +1001,29 @@ export default function GeneratorPage() {
 
           {prompts.length > 0 && (
             <div className="results-area">
-              {prompts.map((p, idx) => {
-                const groups = p.promptGroups || []
-                const isStructured = groups.length > 0 && typeof groups[0] === 'object'
-                const modelUnit = p.segmentUnit || VIDEO_MODELS[form.video_model]?.segmentUnit || 15
-                const modelLabel = VIDEO_MODELS[p.videoModel]?.label || VIDEO_MODELS[form.video_model]?.label || ''
-
-                return (
-                  <div className="result-card" key={idx}>
-                    <div className="result-card-header">
-                      <span className="result-badge">{p.styleLabel || `方案 ${p.index || idx + 1}`}</span>
-                      <div className="result-actions">
-                        <button className="action-btn adopt" onClick={() => handleAdopt(p.index || idx + 1)} title="采纳此方案">👍 采纳</button>
-                        <button className="action-btn violation" onClick={() => setViolationModal({ promptIndex: p.index || idx + 1, historyId })} title="报告违规">⚠️ 违规</button>
-                        <button className="copy-btn-sm" onClick={() => handleCopy(idx, p.finalPrompt)}>
-                          {copied[idx] ? '✓ 已复制' : '📋 复制'}
-                        </button>
-                      </div>
-                    </div>
-                    {p.audit && <div className="result-meta-line"><span className="meta-audit">🛡️ {p.audit}</span></div>}
-                    {p.audioPlan && <div className="result-meta-line"><span className="meta-audio">🎧 {p.audioPlan}</span></div>}
-                    {p.dynamicStrategy && <div className="result-meta-line"><span className="meta-dynamic">⚡ {p.dynamicStrategy}</span></div>}
-
-                    {/* 分组分段展示 — 竖列排列视频片段 */}
-                    {groups.length > 1 ? (
-                      <div className="prompt-groups">
-                        <div className="groups-header">
-                          📑 {modelLabel}：共 {groups.length} 个分段（{modelUnit}s/段），按顺序传给模型，竖列输出视频
-                        </div>
-                        <div className="video-segments">
-                          {groups.map((g, gi) => {
-                            const segPrompt = isStructured ? g.prompt : g
-                            const segStart = isStructured ? g.startTime : gi * modelUnit
-                            const segEnd = isStructured ? g.endTime : Math.min((gi + 1) * modelUnit, parseInt(currentProfile.duration))
-                            const segDur = isStructured ? g.duration : (segEnd - segStart)
-                            return (
-                              <div key={gi} className="video-segment">
-                                <div className="segment-header">
-                                  <span className="segment-order">片段 {gi + 1}</span>
-                                  <span className="segment-time">{segStart}s - {segEnd}s</span>
-                                  <span className="segment-duration">{segDur}s</span>
-                                </div>
-                                <div className="segment-body">
-                                                  <div className="segment-video-placeholder">
-                                    <div className="svp-icon">🎬</div>
-                                    <div className="svp-text">视频 {gi + 1}</div>
-                                    <div className="svp-hint">{segDur}s · {currentProfile.orientation}</div>
-                                  </div>
-                                  <div className="segment-prompt">
-                                    <div className="segment-prompt-label">提示词</div>
-                                    <div className="segment-prompt-text">{segPrompt}</div>
-                                  </div>
-                                </div>
-                                <button className="copy-btn-sm segment-copy" onClick={() => handleCopy(`${idx}-${gi}`, segPrompt)}>
-                                  {copied[`${idx}-${gi}`] ? '✓ 已复制' : '📋 复制此段'}
-                                </button>
-                              </div>
-                            )
-                          })}
-                        </div>
-                      </div>
-                    ) : (
-                      <div className="result-prompt-text">{p.finalPrompt}</div>
-                    )}
-                  </div>
-                )
-              })}
+              <div className="results-toolbar">
+                <span>共 {prompts.length} 条方案</span>
+                <button className="copy-btn-sm" onClick={() => handleCopy('all', 'all', combinedText)}>
+                  {copied?.key === 'all' ? '✓ 已复制' : '📋 复制全部'}
+                </button>
+                <button className="copy-btn-sm" onClick={() => downloadText(combinedText, `${form.product_name || 'prompts'}-提示词.txt`)}>
+                  ⬇️ 下载 TXT
+                </button>
+              </div>
+              {prompts.map((p, idx) => (
+                <ResultCard
+                  key={p.id || idx}
+                  p={p}
+                  idx={idx}
+                  copiedPart={copied && copied.key === (p.id || idx) ? copied.part : null}
+                  saved={!!historyId}
+                  videoModel={form.video_model}
+                  profile={currentProfile}
+                  onCopy={handleCopy}
+                  onAdopt={handleAdopt}
+                  onViolation={openViolation}
+                />
+              ))}
             </div>
           )}
 
@@ -1,5 +1,22 @@
 import { useEffect, useState } from 'react'
 import { promptApi } from '../api'
+import { copyText } from '../utils/clipboard'
+import PageLoading from '../components/PageLoading'
+
+// prompts_json 只在展开时解析，并按记录对象缓存，重复渲染不再逐条 JSON.parse
+const parsedPrompts = new WeakMap()
+function getPrompts(h) {
+  let prompts = parsedPrompts.get(h)
+  if (!prompts) {
+    try {
+      prompts = JSON.parse(h.prompts_json || '[]')
+    } catch {
+      prompts = []
+    }
+    parsedPrompts.set(h, prompts)
+  }
+  return prompts
+}
 
 export default function HistoryPage() {
   const [items, setItems] = useState([])
@@ -50,12 +67,7 @@ export default function HistoryPage() {
     return d.toLocaleString('zh-CN')
   }
 
-  if (loading) return (
-    <div style={{textAlign:'center',paddingTop:80}}>
-      <div className="spinner" style={{margin:'0 auto 16px'}} />
-      <div>加载中...</div>
-    </div>
-  )
+  if (loading) return <PageLoading />
 
   return (
     <div>
@@ -68,13 +80,14 @@ export default function HistoryPage() {
       ) : (
         <div className="history-list">
           {items.map(h => {
-            const prompts = JSON.parse(h.prompts_json || '[]')
+            // 旧记录的 generated_count 是列默认值 0，此时回退到解析出的实际条数
+            const total = h.generated_count || getPrompts(h).length
             return (
-              <div key={h.id} className="history-card" style={{flexDirection:'column',alignItems:'stretch'}}>
-                <div style={{display:'flex',alignItems:'center',justifyContent:'space-between',gap:16}}>
+              <div key={h.id} className="history-card history-card-stacked">
+                <div className="history-card-row">
                   <div className="history-card-info">
                     <h3>{h.product_name}</h3>
-                    <p>{formatDate(h.created_at)} · 共 {prompts.length} 条方案</p>
+                    <p>{formatDate(h.created_at)} · 共 {total} 条方案</p>
                   </div>
                   <div className="history-card-actions">
                     <button className="btn-sm btn-ghost" onClick={() => toggleExpand(h.id)}>
@@ -92,21 +105,21 @@ export default function HistoryPage() {
                 {shareLinks[h.id] && (
                   <div className="share-banner">
                     ✅ 分享链接已生成：<br />
-                    <a href={shareLinks[h.id]} target="_blank" rel="noreferrer" style={{color:'#00d4ff'}}>
+                    <a href={shareLinks[h.id]} target="_blank" rel="noreferrer">
                       {shareLinks[h.id]}
                     </a>
-                    <button className="btn-sm btn-ghost" style={{marginLeft:10,fontSize:'0.8em'}} onClick={() => navigator.clipboard.writeText(shareLinks[h.id])}>
+                    <button className="btn-sm btn-ghost share-copy-btn" onClick={() => copyText(shareLinks[h.id]).catch(() => alert('复制失败，请手动选择文本'))}>
                       复制
                     </button>
                   </div>
                 )}
 
                 {expanded[h.id] && (
-                  <div style={{marginTop:14,display:'grid',gridTemplateColumns:'repeat(auto-fill,minmax(300px,1fr))',gap:12}}>
-                    {prompts.map((p, i) => (
-                      <div key={i} style={{background:'rgba(0,0,0,0.3)',borderRadius:10,padding:14}}>
-                        <div style={{fontWeight:'bold',color:'#00d4ff',marginBottom:8,fontSize:'0.9em'}}>方案 {p.index || i+1}</div>
-                        <div style={{fontSize:'0.82em',lineHeight:1.6,color:'#ccc',whiteSpace:'pre-wrap'}}>{p.finalPrompt}</div>
+                  <div className="history-prompt-grid">
+                    {getPrompts(h).map((p, i) => (
+                      <div key={p.id || i} className="history-prompt">
+                        <div className="history-prompt-title">方案 {p.index || i+1}</div>
+                        <div className="history-prompt-text">{p.finalPrompt}</div>
                       </div>
                     ))}
                   </div>
@@ -1,6 +1,8 @@
 import { useEffect, useState } from 'react'
 import { useParams } from 'react-router-dom'
 import { promptApi } from '../api'
+import { copyText } from '../utils/clipboard'
+import PageLoading from '../components/PageLoading'
 
 export default function SharePage() {
   const { token } = useParams()
@@ -17,12 +19,7 @@ export default function SharePage() {
     <div style={{textAlign:'center',paddingTop:100,color:'#ff8080'}}>{error}</div>
   )
 
-  if (!data) return (
-    <div style={{textAlign:'center',paddingTop:80}}>
-      <div className="spinner" style={{margin:'0 auto 16px'}} />
-      <div>加载中...</div>
-    </div>
-  )
+  if (!data) return <PageLoading />
 
   const prompts = JSON.parse(data.prompts_json || '[]')
 
@@ -37,7 +34,7 @@ export default function SharePage() {
           <div className="result-card" key={i}>
             <div className="result-header">
               <span className="result-number">方案 {p.index || i+1}</span>
-              <button className="copy-btn" onClick={() => navigator.clipboard.writeText(p.finalPrompt)}>📋 复制</button>
+              <button className="copy-btn" onClick={() => copyText(p.finalPrompt).catch(() => alert('复制失败，请手动选择文本'))}>📋 复制</button>
             </div>
             {p.audioPlan && (
               <div className="av-plan-section">
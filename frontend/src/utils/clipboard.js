@@ -0,0 +1,20 @@
+// 复制文本到剪贴板
+// 优先使用 Clipboard API；非 HTTPS / 旧浏览器下退回隐藏 textarea + execCommand
+export async function copyText(text) {
+  if (navigator.clipboard && window.isSecureContext) {
+    await navigator.clipboard.writeText(text)
+    return
+  }
+  const textarea = document.createElement('textarea')
+  textarea.value = text
+  textarea.setAttribute('readonly', '')
+  textarea.style.position = 'fixed'
+  textarea.style.opacity = '0'
+  document.body.appendChild(textarea)
+  textarea.select()
+  try {
+    if (!document.execCommand('copy')) throw new Error('copy failed')
+  } finally {
+    document.body.removeChild(textarea)
+  }
+}